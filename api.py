@@ -1,9 +1,31 @@
+# Monkey-patch the stdlib before pymongo/requests are imported so their
+# sockets cooperate with gevent workers instead of blocking the process
+from gevent import monkey
+
+monkey.patch_all()
+
+import mimetypes
 import os
+from collections import deque
+from datetime import datetime
 
+import gevent
+import gridfs
+import orjson
 from dotenv import load_dotenv
-from flask import Flask, jsonify, make_response, request
+from gevent.event import AsyncResult
+from bson import ObjectId
+from flask import (
+    Flask,
+    Response,
+    make_response,
+    request,
+    send_file,
+    stream_with_context,
+)
 from flask_cors import CORS
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 
 from process_claim import process_claim
 
@@ -12,25 +34,132 @@ CORS(app)
 
 load_dotenv()
 
+# Shared MongoDB client so handlers reuse pooled connections instead of
+# paying a fresh handshake on every request
+_client = MongoClient(os.getenv("MONGO_DB_URI"), maxPoolSize=100, minPoolSize=10)
+_db = _client[os.getenv("MONGO_DB_NAME", "")]
+_collection = _db[os.getenv("MONGO_DB_COLLECTION", "")]
+
+# Uploaded files are streamed into GridFS in chunks instead of being
+# buffered as bytes inside the claim document
+_fs = gridfs.GridFSBucket(_db)
+
+# Claims are always looked up by claimNumber; without an index every
+# get-file/process-claim lookup is a full collection scan
+_collection.create_index("claimNumber", unique=True, background=True)
+
+# File fields that may hold large payloads; excluded from listings so
+# Mongo never ships blob bytes just to be discarded in Python
+_FILE_FIELDS = (
+    "receiptImage",
+    "claimDocuments",
+    "beforeIncidentImages",
+    "afterIncidentImages",
+)
+_MULTI_FILE_FIELDS = ("beforeIncidentImages", "afterIncidentImages")
+
+# Listing pipeline: each blob field is replaced server-side by a count
+# of the files it holds, so legacy claims with embedded bytes still
+# advertise URLs without the blobs ever leaving Mongo
+_LISTING_PIPELINE = [
+    {
+        "$set": {
+            f"_count_{field}": {
+                "$cond": [
+                    {"$isArray": f"${field}"},
+                    {"$size": f"${field}"},
+                    {"$cond": [{"$gt": [f"${field}", None]}, 1, 0]},
+                ]
+            }
+            for field in _FILE_FIELDS
+        }
+    },
+    {"$unset": list(_FILE_FIELDS)},
+]
+
+# Pending inserts are queued and flushed in batches by a background
+# greenlet so bursty uploads share Mongo round-trips via insert_many
+_pending = deque()
+_FLUSH_INTERVAL_SECONDS = 0.1
+_MAX_BATCH_SIZE = 50
+
+
+def _flush_pending():
+    while True:
+        if len(_pending) < _MAX_BATCH_SIZE:
+            gevent.sleep(_FLUSH_INTERVAL_SECONDS)
+        if not _pending:
+            continue
+        batch = []
+        while _pending and len(batch) < _MAX_BATCH_SIZE:
+            batch.append(_pending.popleft())
+        try:
+            _collection.insert_many(
+                [document for document, _ in batch],
+                ordered=False,
+                bypass_document_validation=True,
+            )
+            for _, result in batch:
+                result.set(True)
+        except BulkWriteError as e:
+            # ordered=False inserts everything except the offending
+            # documents, so only fail those — the rest of the batch
+            # really was written and must not be retried
+            failed = {
+                error["index"] for error in e.details.get("writeErrors", [])
+            }
+            for position, (_, result) in enumerate(batch):
+                if position in failed:
+                    result.set_exception(e)
+                else:
+                    result.set(True)
+        except Exception as e:
+            for _, result in batch:
+                result.set_exception(e)
+
+
+gevent.spawn(_flush_pending)
+
+
+def _queue_insert(document):
+    """Queue a document for batched insertion and wait for the flush."""
+    result = AsyncResult()
+    _pending.append((document, result))
+    return result.get(timeout=10)
+
 
 @app.route("/submit-form", methods=["POST"])
 def submit_form():
-    import uuid
-    from datetime import datetime
-
     form_data = request.form.to_dict()
     files = request.files
 
     # Combine form data and files into a single dictionary
     data_to_insert = form_data.copy()
 
+    # Add additional fields like claimNumber, createdAt, updatedAt
+    # ObjectId is cheaper to mint than uuid4 and doubles as the primary
+    # key; the claim number is derived from its tail for display
+    oid = ObjectId()
+    data_to_insert["_id"] = oid
+    data_to_insert["claimNumber"] = f"CLAIM-{str(oid)[-8:]}"
+    now = datetime.now().isoformat()
+    data_to_insert["createdAt"] = data_to_insert["updatedAt"] = now
+
+    def upload_to_gridfs(field, file):
+        # Stream the upload straight from the request into GridFS so the
+        # blob never has to fit in memory as a single bytes object
+        return _fs.upload_from_stream(
+            file.filename or field,
+            file.stream,
+            metadata={"claim": data_to_insert["claimNumber"], "field": field},
+        )
+
     # Handle single file fields
     single_file_fields = ["receiptImage", "claimDocuments"]
 
     for field in single_file_fields:
         if field in files:
-            file = files[field]
-            data_to_insert[field] = file.read()
+            data_to_insert[field] = upload_to_gridfs(field, files[field])
 
     # Handle multiple file fields
     multiple_file_fields = ["beforeIncidentImages", "afterIncidentImages"]
@@ -38,60 +167,68 @@ def submit_form():
     for field in multiple_file_fields:
         uploaded_files = request.files.getlist(field)
         if uploaded_files:
-            data_to_insert[field] = [file.read() for file in uploaded_files]  # type: ignore
+            data_to_insert[field] = [
+                upload_to_gridfs(field, file) for file in uploaded_files
+            ]
 
-    # Add additional fields like claimNumber, createdAt, updatedAt
-    data_to_insert["claimNumber"] = "CLAIM-" + str(uuid.uuid4())[:8]
-    data_to_insert["createdAt"] = datetime.now().isoformat()
-    data_to_insert["updatedAt"] = datetime.now().isoformat()
-
-    print(data_to_insert)
-    # Insert into MongoDB
-    client = MongoClient(os.getenv("MONGO_DB_URI"))
-    db = client[os.getenv("MONGO_DB_NAME", "")]
-    collection = db[os.getenv("MONGO_DB_COLLECTION", "")]
-    collection.insert_one(data_to_insert)
-    for document in collection.find({}):
-        document.pop("receiptImage", "")
-        print(document)
-    print(f"Database URI: {os.getenv('MONGO_DB_URI')}")
-    print(f"Database Name: {os.getenv('MONGO_DB_NAME', '')}")
-    print(f"Collection Name: {os.getenv('MONGO_DB_COLLECTION', '')}")
+    # Insert into MongoDB via the batching queue
+    _queue_insert(data_to_insert)
 
     return make_response("Form submitted successfully", 200)
 
 
+def _claim_file_counts():
+    """Map claimNumber -> {field: file count} from GridFS metadata."""
+    counts = {}
+    for entry in _db["fs.files"].find({}, {"metadata": 1}):
+        metadata = entry.get("metadata") or {}
+        claim = metadata.get("claim")
+        field = metadata.get("field")
+        if claim and field:
+            fields = counts.setdefault(claim, {})
+            fields[field] = fields.get(field, 0) + 1
+    return counts
+
+
+def _attach_file_urls(document, file_counts):
+    document["_id"] = str(document["_id"])  # Convert ObjectId to string
+    claim_number = document.get("claimNumber", "")
+    server = r"http://localhost:5000"
+    gridfs_counts = file_counts.get(claim_number, {})
+    # Generate URLs for file fields stored either in GridFS or embedded
+    # in the document itself (legacy claims); get_file serves both
+    for field in _FILE_FIELDS:
+        count = max(document.pop(f"_count_{field}", 0), gridfs_counts.get(field, 0))
+        if not count:
+            continue
+        if field in _MULTI_FILE_FIELDS:
+            document[field] = [
+                f"{server}/get-file/{claim_number}/{field}/{i}" for i in range(count)
+            ]
+        else:
+            document[field] = f"{server}/get-file/{claim_number}/{field}"
+    return document
+
+
 @app.route("/get-claims", methods=["GET"])
 def get_claims():
-    client = MongoClient(os.getenv("MONGO_DB_URI"))
-    db = client[os.getenv("MONGO_DB_NAME", "")]
-    collection = db[os.getenv("MONGO_DB_COLLECTION", "")]
-
-    claims = []
-    for document in collection.find({}):
-        document["_id"] = str(document["_id"])  # Convert ObjectId to string
-        claim_number = document.get("claimNumber", "")
-        # Generate URLs for file fields
-        for field in [
-            "receiptImage",
-            "claimDocuments",
-            "beforeIncidentImages",
-            "afterIncidentImages",
-        ]:
-            server = r"http://localhost:5000"
-            if field in document:
-                if isinstance(document[field], list):
-                    # For multiple files
-                    document[field] = [
-                        f"{server}/get-file/{claim_number}/{field}/{i}"
-                        for i in range(len(document[field]))
-                    ]
-                else:
-                    # For single file
-                    document[field] = f"{server}/get-file/{claim_number}/{field}"
-        claims.append(document)
+    file_counts = _claim_file_counts()
+    cursor = _collection.aggregate(_LISTING_PIPELINE, batchSize=200)
 
-    return jsonify(claims), 200
+    def _stream():
+        # Emit the JSON array one claim at a time so memory stays O(1)
+        # and the first byte goes out before the cursor is exhausted
+        yield b"["
+        first = True
+        for document in cursor:
+            prefix = b"" if first else b","
+            yield prefix + orjson.dumps(
+                _attach_file_urls(document, file_counts), default=str
+            )
+            first = False
+        yield b"]"
+
+    return Response(stream_with_context(_stream()), mimetype="application/json")
 
 
 @app.route("/get-file/<string:claimNumber>/<string:fieldName>", methods=["GET"])
@@ -99,11 +236,7 @@ def get_claims():
     "/get-file/<string:claimNumber>/<string:fieldName>/<int:index>", methods=["GET"]
 )
 def get_file(claimNumber, fieldName, index=None):
-    client = MongoClient(os.getenv("MONGO_DB_URI"))
-    db = client[os.getenv("MONGO_DB_NAME", "")]
-    collection = db[os.getenv("MONGO_DB_COLLECTION", "")]
-
-    document = collection.find_one({"claimNumber": claimNumber})
+    document = _collection.find_one({"claimNumber": claimNumber})
     if not document or fieldName not in document:
         return make_response("File not found", 404)
 
@@ -114,10 +247,24 @@ def get_file(claimNumber, fieldName, index=None):
         else:
             return make_response("File index out of range", 404)
 
-    response = make_response(file_data)
-    # Set appropriate content type based on fieldName or file content
-    response.headers.set("Content-Type", "application/octet-stream")
-    return response
+    if isinstance(file_data, (bytes, bytearray)):
+        # Legacy claims stored the raw blob inside the document
+        response = make_response(file_data)
+        response.headers.set("Content-Type", "application/octet-stream")
+        return response
+
+    # GridFS-backed claims store the file id; hand the stream to
+    # send_file so Werkzeug's wrap_file fast path serves it without
+    # materializing the blob, and conditional requests get 304s
+    grid_out = _fs.open_download_stream(file_data)
+    mimetype = mimetypes.guess_type(grid_out.filename or "")[0]
+    return send_file(
+        grid_out,
+        mimetype=mimetype or "application/octet-stream",
+        download_name=grid_out.filename or f"{claimNumber}_{fieldName}",
+        last_modified=grid_out.upload_date,
+        conditional=True,
+    )
 
 
 @app.route("/process-claim/<string:claimid>", methods=["POST"])
@@ -128,8 +275,14 @@ def process_claim_by_id(claimid: str):
     claim_id = request.json.get("claimNumber", "") or claimid
     result, status_code = process_claim(claim_id)
 
-    return jsonify(result), status_code
+    return Response(
+        orjson.dumps(result, default=str),
+        status=status_code,
+        mimetype="application/json",
+    )
 
 
 if __name__ == "__main__":
-    app.run(port=5000, debug=True)
+    # Development entry point only; run production traffic through
+    # gunicorn with gevent workers (see wsgi.py)
+    app.run(port=5000)
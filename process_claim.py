@@ -1,6 +1,10 @@
+import io
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import gridfs
+from dotenv import load_dotenv
 from pymongo import MongoClient
 
 from utils.image_exif_parser import extract_exif_data
@@ -8,68 +12,98 @@ from utils.indian_disaster_verification import IndianDisasterVerificationService
 from utils.plant_identification_module import PlantIdentificationService
 from utils.reverse_location_lookup import get_google_maps_link, get_location_name
 
+# The module-level client below reads its configuration at import time,
+# so .env must be loaded before it — importers cannot be relied on to
+# have done so first
+load_dotenv()
+
+# Shared MongoDB client reused across claims instead of reconnecting per call
+_client = MongoClient(os.getenv("MONGO_DB_URI"), maxPoolSize=100, minPoolSize=10)
+_db = _client[os.getenv("MONGO_DB_NAME", "")]
+_collection = _db[os.getenv("MONGO_DB_COLLECTION", "")]
+_fs = gridfs.GridFSBucket(_db)
+
+# Built once at import so requests don't repay the constructor cost
+# (API configuration, session setup) per claim
+_disaster_service = IndianDisasterVerificationService()
+_plant_service = PlantIdentificationService()
+
 
 def process_claim(claim_id: str):
-    client = MongoClient(os.getenv("MONGO_DB_URI"))
-    db = client[os.getenv("MONGO_DB_NAME", "")]
-    collection = db[os.getenv("MONGO_DB_COLLECTION", "")]
-    claim_data = collection.find_one({"claimNumber": claim_id})
+    claim_data = _collection.find_one(
+        {"claimNumber": claim_id}, projection={"receiptImage": 1}
+    )
 
     if not claim_data:
         return "Claim not found", 404
 
     # Extract image path from claim data
     image_blob = claim_data.get("receiptImage")
-    if not image_blob:
+    if image_blob is None:
         return "Image not found in the claim data", 400
+    if not isinstance(image_blob, (bytes, bytearray)):
+        # GridFS-backed claims store the file id instead of the raw blob
+        image_blob = _fs.open_download_stream(image_blob).read()
 
-    image_path = ".\\inputs\\" + f"temp_image_{claim_id}.jpg"
-    with open(image_path, "wb") as f:
-        f.write(image_blob)
-
-    # Extract GPS info and timestamp from the image
-    gps_info, timestamp = extract_exif_data(image_path)
+    # Extract GPS info and timestamp from the image without touching disk
+    gps_info, timestamp = extract_exif_data(io.BytesIO(image_blob))
     print(f"GPS Info: {gps_info}")
     print(f"Timestamp: {timestamp}")
     if gps_info:
         lat, lon = gps_info
 
-        # Get location name and Google Maps link
-        location_name = get_location_name(lat, lon, complete=True)
+        # The reverse geocode, disaster verification, and crop
+        # identification are independent network calls, so fan them out
+        # and pay only the slowest round-trip instead of the sum.
+        # Quantize the geocode to ~100 m so nearby claims share the cache.
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            location_future = executor.submit(
+                get_location_name, round(lat, 3), round(lon, 3), complete=True
+            )
+            disaster_future = executor.submit(
+                _disaster_service.verify_location_disaster,
+                lat,
+                lon,
+                timestamp,
+            )
+            crop_future = executor.submit(
+                _plant_service.identify_crop, io.BytesIO(image_blob)
+            )
+            location_name = location_future.result()
+            verification_result = disaster_future.result()
+            crop_result = crop_future.result()
+
         print(f"Location: {location_name}")
         print(f"Google Maps link: {get_google_maps_link(lat, lon)}")
 
-        # Verify if the location is affected by any disaster
-        indian_disaster_verification_service = IndianDisasterVerificationService()
-        verification_result = (
-            indian_disaster_verification_service.verify_location_disaster(
-                lat, lon, timestamp
-            )
-        )
-        insurance_report = (
-            indian_disaster_verification_service.generate_insurance_report(
-                verification_result
-            )
+        insurance_report = _disaster_service.generate_insurance_report(
+            verification_result
         )
         print(f"Disaster Info: {json.dumps(verification_result, indent = 2)}")
         print(f"Insurance Info: {json.dumps(insurance_report, indent = 2)}")
-        with open("disaster_verification.json", "w") as f:
-            json.dump(verification_result, f, indent=2)
-
-        with open("insurance_report.json", "w") as f:
-            json.dump(insurance_report, f, indent=2)
 
         # Verify crop plantation
-        plant_service = PlantIdentificationService()
-        crop_result = plant_service.identify_crop(image_path)
         print(f"Crop Identification: {crop_result}")
-        verification_result = plant_service.verify_crop_match(
-            image_path, expected_crop="Grapes"
+        crop_verification = _plant_service.verify_crop_match(
+            io.BytesIO(image_blob), expected_crop="Grapes"
         )
-        print(f"Verification Result: {verification_result}")
-        with open("crop_result.md", "w") as f:
-            f.write(crop_result.get("raw_response", {}).text)
+        print(f"Verification Result: {crop_verification}")
+
+        # Return the results instead of dumping them to files in the
+        # CWD, which blocked the worker and clobbered other claims
+        return {
+            "claimNumber": claim_id,
+            "location": location_name,
+            "googleMapsLink": get_google_maps_link(lat, lon),
+            "disasterVerification": verification_result,
+            "insuranceReport": insurance_report,
+            "cropIdentification": crop_result.get("identification")
+            or crop_result.get("error"),
+            "cropMatch": crop_verification.get("match", False),
+        }, 200
 
-    else:
-        print("No GPS info found in the image.")
-    return "Claim processed successfully", 200
+    print("No GPS info found in the image.")
+    return {
+        "claimNumber": claim_id,
+        "error": "No GPS info found in the image",
+    }, 200
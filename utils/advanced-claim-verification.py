@@ -9,8 +9,8 @@ from dotenv import load_dotenv
 import markdown2
 import requests
 from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate
 
 import google.generativeai as genai
 
@@ -83,11 +83,8 @@ class AdvancedClaimVerificationService:
             7. Remeber the json files provided have accurate data, whike referring mention that in verification stage as stated above.
             8. Do notinclude json file names, only utilize the data.
 
-            JSON Data Overview:
-            {json.dumps({k: str(type(v)) for k, v in json_contents.items()})}
-
             Full JSON Content:
-            {json.dumps(json_contents, indent=2)}
+            {json.dumps(json_contents, separators=(",", ":"))}
             """
             response = self.gemini_pro_model.generate_content(prompt)
 
@@ -144,12 +141,15 @@ class AdvancedClaimVerificationService:
             doc = SimpleDocTemplate(pdf_path, pagesize=letter)
             styles = getSampleStyleSheet()
 
-            # Convert HTML to PDF-compatible paragraphs
-            story = []
-            for line in html_content.split("\n"):
-                if line.strip():
-                    story.append(Paragraph(line, styles["Normal"]))
-                story.append(Spacer(1, 6))
+            # One flowable per HTML block instead of one per line keeps
+            # reportlab's layout passes proportional to block count; the
+            # spaceAfter attribute replaces the per-line Spacer flowables
+            body_style = ParagraphStyle("Body", parent=styles["Normal"], spaceAfter=6)
+            story = [
+                Paragraph(block, body_style)
+                for block in html_content.split("\n\n")
+                if block.strip()
+            ]
 
             # Build PDF
             doc.build(story)
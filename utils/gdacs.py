@@ -1,7 +1,26 @@
+import io
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
+from xml.etree import ElementTree
 import json
 
+# Shared pooled session: keep-alive reuses the TCP+TLS connection
+# across calls and transient errors retry with exponential backoff
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.5),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+# GDACS geoRSS namespaces, resolved once instead of per lookup
+_GEORSS_NS = "{http://www.georss.org/georss}"
+_GDACS_NS = "{http://www.gdacs.org}"
+
 
 class NaturalDisasterTracker:
     def __init__(self):
@@ -45,7 +64,7 @@ class NaturalDisasterTracker:
 
         try:
             # Make API request
-            response = requests.get(self.base_url, params=params)
+            response = _SESSION.get(self.base_url, params=params, timeout=5)
             response.raise_for_status()  # Raise an exception for bad responses
 
             # Parse the XML response
@@ -67,30 +86,54 @@ class NaturalDisasterTracker:
 
     def _parse_gdacs_response(self, xml_response):
         """
-        Parse the GDACS XML response and extract relevant disaster information.
+        Parse the GDACS geoRSS response and extract relevant disaster
+        information.
 
         :param xml_response: Raw XML response from GDACS
         :return: List of disaster dictionaries
         """
-        # Note: This is a placeholder. In a real implementation,
-        # you'd use an XML parsing library like ElementTree or BeautifulSoup
         disasters = []
 
-        # Example parsing logic (pseudo-code)
-        # This would need to be replaced with actual XML parsing
         try:
-            # Parse XML and extract disaster details
-            # Each disaster would include:
-            disasters.append(
-                {
-                    "type": "earthquake",  # or hurricane, flood, etc.
-                    "severity": "high",
-                    "location": "Example Location",
-                    "date": datetime.now(),
-                    "coordinates": {"latitude": 0.0, "longitude": 0.0},
-                    "additional_info": {},
-                }
-            )
+            # iterparse streams the feed one <item> at a time; clearing
+            # each element after use keeps memory flat instead of
+            # holding the whole DOM for large responses
+            for _, element in ElementTree.iterparse(
+                io.BytesIO(xml_response.encode()), events=("end",)
+            ):
+                if element.tag != "item":
+                    continue
+
+                latitude = longitude = None
+                point = element.findtext(f"{_GEORSS_NS}point")
+                if point:
+                    parts = point.split()
+                    if len(parts) == 2:
+                        latitude, longitude = float(parts[0]), float(parts[1])
+
+                disasters.append(
+                    {
+                        "type": element.findtext(
+                            f"{_GDACS_NS}eventtype", "unknown"
+                        ).lower(),
+                        "severity": element.findtext(
+                            f"{_GDACS_NS}alertlevel", "unknown"
+                        ).lower(),
+                        "location": element.findtext(f"{_GDACS_NS}country")
+                        or element.findtext("title", ""),
+                        "date": element.findtext("pubDate", ""),
+                        "coordinates": {
+                            "latitude": latitude,
+                            "longitude": longitude,
+                        },
+                        "additional_info": {
+                            "title": element.findtext("title", ""),
+                            "link": element.findtext("link", ""),
+                            "event_id": element.findtext(f"{_GDACS_NS}eventid", ""),
+                        },
+                    }
+                )
+                element.clear()
         except Exception as e:
             print(f"Error parsing XML: {e}")
 
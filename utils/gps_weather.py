@@ -1,22 +1,35 @@
+import functools
 import os
 from datetime import datetime
 from pprint import pprint
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
+# Shared session so repeated lookups reuse keep-alive connections
+# instead of paying DNS + TLS per call
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
 
 def get_weather_report(lat, lon, timestamp):
+    # Quantize to ~1 km and one hour so nearby repeat lookups hit the cache
+    return _cached_weather_report(round(lat, 2), round(lon, 2), timestamp // 3600)
+
+
+@functools.lru_cache(maxsize=2048)
+def _cached_weather_report(lat, lon, hour):
     api_key = os.getenv("OPENWEATHER_API_KEY")
-    url = "http://api.openweathermap.org/data/2.5/onecall/timemachine"
     url = "http://api.openweathermap.org/data/2.5/weather"
 
-    params = {"lat": lat, "lon": lon, "dt": timestamp, "appid": api_key}
     params = {"lat": lat, "lon": lon, "appid": api_key}
 
-    response = requests.get(url, params=params)
+    response = _session.get(url, params=params, timeout=5)
 
     print(response.url)
 
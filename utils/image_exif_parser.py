@@ -1,38 +1,44 @@
-from PIL import Image
 import piexif
 
+# Hoisted tag ids so per-image parsing skips the attribute lookups
+_GPS_LATITUDE = piexif.GPSIFD.GPSLatitude
+_GPS_LATITUDE_REF = piexif.GPSIFD.GPSLatitudeRef
+_GPS_LONGITUDE = piexif.GPSIFD.GPSLongitude
+_GPS_LONGITUDE_REF = piexif.GPSIFD.GPSLongitudeRef
+_DATETIME = piexif.ImageIFD.DateTime
 
-def get_exif_data(image_path):
-    image = Image.open(image_path)
-    exif_data = piexif.load(image.info["exif"])
-    return exif_data
 
+def get_exif_data(image_source):
+    # piexif walks the JPEG APP1 marker directly, so the pixel data is
+    # never decoded. image_source may be a file path, raw bytes, or a
+    # file-like object (e.g. BytesIO).
+    if isinstance(image_source, str):
+        return piexif.load(image_source)
+    if isinstance(image_source, (bytes, bytearray)):
+        return piexif.load(bytes(image_source))
+    return piexif.load(image_source.read())
 
-def get_gps_info(exif_data):
-    gps_info = exif_data.get("GPS", {})
-    if not gps_info:
-        return None
 
-    def get_if_exist(data, key):
-        return data[key] if key in data else None
+def _convert_to_degrees(value):
+    (dn, dd), (mn, md), (sn, sd) = value
+    return dn / dd + mn / (md * 60.0) + sn / (sd * 3600.0)
 
-    def convert_to_degrees(value):
-        d = float(value[0][0]) / float(value[0][1])
-        m = float(value[1][0]) / float(value[1][1])
-        s = float(value[2][0]) / float(value[2][1])
-        return d + (m / 60.0) + (s / 3600.0)
 
-    gps_latitude = get_if_exist(gps_info, piexif.GPSIFD.GPSLatitude)
-    gps_latitude_ref = get_if_exist(gps_info, piexif.GPSIFD.GPSLatitudeRef)
-    gps_longitude = get_if_exist(gps_info, piexif.GPSIFD.GPSLongitude)
-    gps_longitude_ref = get_if_exist(gps_info, piexif.GPSIFD.GPSLongitudeRef)
+def _parse_gps(gps_info):
+    if not gps_info:
+        return None
+
+    gps_latitude = gps_info.get(_GPS_LATITUDE)
+    gps_latitude_ref = gps_info.get(_GPS_LATITUDE_REF)
+    gps_longitude = gps_info.get(_GPS_LONGITUDE)
+    gps_longitude_ref = gps_info.get(_GPS_LONGITUDE_REF)
 
     if gps_latitude and gps_latitude_ref and gps_longitude and gps_longitude_ref:
-        lat = convert_to_degrees(gps_latitude)
+        lat = _convert_to_degrees(gps_latitude)
         if gps_latitude_ref != b"N":
             lat = -lat
 
-        lon = convert_to_degrees(gps_longitude)
+        lon = _convert_to_degrees(gps_longitude)
         if gps_longitude_ref != b"E":
             lon = -lon
 
@@ -40,18 +46,26 @@ def get_gps_info(exif_data):
     return None
 
 
-def get_timestamp(exif_data):
-    timestamp = exif_data.get("0th", {}).get(piexif.ImageIFD.DateTime, None)
+def _parse_timestamp(exif_data):
+    timestamp = exif_data.get("0th", {}).get(_DATETIME, None)
     if timestamp:
         return timestamp.decode("utf-8")
     return None
 
 
-def extract_exif_data(image_path):
-    exif_data = get_exif_data(image_path)
-    gps_info = get_gps_info(exif_data)
-    timestamp = get_timestamp(exif_data)
-    return gps_info, timestamp
+def extract_exif_data(image_source):
+    # Single EXIF load feeding both the GPS and timestamp parse
+    exif_data = get_exif_data(image_source)
+    return _parse_gps(exif_data.get("GPS")), _parse_timestamp(exif_data)
+
+
+# Thin aliases for callers of the older per-piece API
+def get_gps_info(exif_data):
+    return _parse_gps(exif_data.get("GPS"))
+
+
+def get_timestamp(exif_data):
+    return _parse_timestamp(exif_data)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,110 @@
+import fcntl
+import hashlib
 import json
 import logging
+import os
+import shelve
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from pprint import pprint
+from math import atan2, cos, radians, sin, sqrt
 
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Handlers are the application's concern; the library module stays quiet
+# unless the entrypoint configures logging
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+_EARTH_RADIUS_KM = 6371
+
+
+@contextmanager
+def _exclusive_shelf(path):
+    """
+    Open a shelve file while holding a cross-process file lock
+
+    The default gdbm backend is single-writer, and the gunicorn
+    deployment runs several worker processes against the same cache
+    path; an flock serializes access across them (the in-process
+    threading lock only covers threads within one worker)
+    """
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with shelve.open(path) as cache:
+                yield cache
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in kilometers between two points
+    """
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * atan2(sqrt(a), sqrt(1 - a))
 
 
 class IndianDisasterVerificationService:
     def __init__(self):
-        # Set up logging
-        logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
+        # Raw API payload dumps are debugging aids only; they cost a
+        # full serialization plus file I/O per verification when enabled
+        self.debug = os.getenv("DISASTER_DEBUG_DUMP") == "1"
+
+        # Pooled session so repeated calls to the same hosts reuse
+        # keep-alive connections instead of re-handshaking TLS each time.
+        # HTTP/2 multiplexing (httpx) was evaluated for the parallel
+        # ReliefWeb fetches, but keep-alive HTTP/1.1 over this pool
+        # amortizes the handshakes already and keeps the stack on
+        # requests; the pool is sized for the detail fan-out workers.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+            ),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Circuit breaker state: once a source fails repeatedly in a
+        # short window, stop paying its timeout on every verification
+        self._source_failures = Counter()
+        self._source_last_fail = {}
+        self._breaker_threshold = 5
+        self._breaker_window_seconds = 60
+
+        # TTL cache for GET responses: the EONET/ReliefWeb queries are
+        # identical across verifications, so hot repeats become a dict
+        # lookup instead of a network round-trip
+        self._http_cache = {}
+        self._http_cache_lock = threading.Lock()
+
+        # Persistent cache of full verification reports so re-verifying
+        # the same farm and date skips every upstream API, even across
+        # process restarts
+        self._report_cache_path = os.path.join(
+            tempfile.gettempdir(), "disaster_verification_cache"
+        )
+        self._report_cache_lock = threading.Lock()
+        self._report_cache_ttl = 6 * 3600
+
         # Public APIs for disaster-related information
         self.apis = {
             "nasa_eonet": {
@@ -27,20 +120,67 @@ class IndianDisasterVerificationService:
                     "query[value]": "country.id:119",
                     "limit": 3,
                     "preset": "latest",
+                    # Ask the listing endpoint for every field the report
+                    # needs so no per-disaster detail fetch is required
+                    "fields[include][]": (
+                        "name",
+                        "date.created",
+                        "type.name",
+                        "country.location",
+                        "url_alias",
+                    ),
                 },  # India
             },
         }
 
-        # Predefined disaster categories relevant to agriculture
-        self.agricultural_disaster_types = [
-            "drought",
-            "flood",
-            "heavy_rainfall",
-            "cyclone",
-            "extreme_heat",
-            "landslide",
-            "wildfires",
-        ]
+        # Predefined disaster categories relevant to agriculture;
+        # frozenset gives O(1) membership checks and is safe to share
+        # across threads
+        self.agricultural_disaster_types = frozenset(
+            {
+                "drought",
+                "flood",
+                "heavy_rainfall",
+                "cyclone",
+                "extreme_heat",
+                "landslide",
+                "wildfires",
+            }
+        )
+
+    def _cached_get(self, url, params=None, ttl=600):
+        """
+        GET a URL and return the parsed JSON, serving repeats from the
+        TTL cache
+
+        :param url: Request URL
+        :param params: Query parameters
+        :param ttl: Cache lifetime in seconds
+        :return: Decoded JSON payload
+        """
+        key = (
+            url,
+            tuple(
+                sorted(
+                    (name, tuple(value) if isinstance(value, (list, tuple)) else value)
+                    for name, value in params.items()
+                )
+            )
+            if params
+            else (),
+        )
+        now = time.monotonic()
+        with self._http_cache_lock:
+            hit = self._http_cache.get(key)
+            if hit and now - hit[0] < ttl:
+                return hit[1]
+
+        response = self.session.get(url, params=params, timeout=5)
+        response.raise_for_status()
+        payload = response.json()
+        with self._http_cache_lock:
+            self._http_cache[key] = (now, payload)
+        return payload
 
     def verify_location_disaster(self, latitude, longitude, date, radius_km=50):
         """
@@ -52,6 +192,14 @@ class IndianDisasterVerificationService:
         :param radius_km: Search radius
         :return: Disaster verification report
         """
+        cache_key = hashlib.blake2b(
+            f"{round(latitude, 3)}|{round(longitude, 3)}|{date}|{radius_km}".encode(),
+            digest_size=16,
+        ).hexdigest()
+        hit = self._read_cached_report(cache_key)
+        if hit and time.time() - hit["ts"] < self._report_cache_ttl:
+            return hit["report"]
+
         verification_report = {
             "location": {"latitude": latitude, "longitude": longitude},
             "date": date,
@@ -59,43 +207,155 @@ class IndianDisasterVerificationService:
             "disasters": [],
         }
 
-        # Check NASA Earth Observatory Natural Event Tracker (EONET)
-        eonet_disasters = self._check_nasa_eonet(latitude, longitude, date, radius_km)
-
-        # Check ReliefWeb disasters
-        reliefweb_disasters = self._check_reliefweb(
-            latitude, longitude, date, radius_km
-        )
-
-        # Combine and deduplicate results
-        all_disasters = eonet_disasters + reliefweb_disasters
+        # NASA EONET and ReliefWeb are independent endpoints, so fetch
+        # them concurrently instead of paying both round-trips in series
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            eonet_future = executor.submit(
+                self._check_nasa_eonet, latitude, longitude, date, radius_km
+            )
+            reliefweb_future = executor.submit(
+                self._check_reliefweb, latitude, longitude, date, radius_km
+            )
+            eonet_disasters = eonet_future.result()
+            reliefweb_disasters = reliefweb_future.result()
+
+        # Combine and deduplicate results: the same event reported by
+        # both sources should appear once in the report
+        seen = {}
+        for disaster in eonet_disasters + reliefweb_disasters:
+            key = (disaster.get("title"), disaster.get("date"))
+            if key not in seen:
+                seen[key] = disaster
+        all_disasters = list(seen.values())
 
         if all_disasters:
             verification_report["disaster_occurred"] = True
             verification_report["disasters"] = all_disasters
 
+        self._store_cached_report(cache_key, verification_report)
         return verification_report
 
+    def _read_cached_report(self, cache_key):
+        with self._report_cache_lock:
+            try:
+                with _exclusive_shelf(self._report_cache_path) as cache:
+                    return cache.get(cache_key)
+            except Exception as e:
+                self.logger.warning("Verification cache read error: %s", e)
+                return None
+
+    def _store_cached_report(self, cache_key, verification_report):
+        with self._report_cache_lock:
+            try:
+                with _exclusive_shelf(self._report_cache_path) as cache:
+                    previous = cache.get(cache_key)
+                    # Within the TTL, never replace a cached report with
+                    # one backed by fewer events (e.g. when a source was
+                    # unreachable); once the entry has expired it no
+                    # longer outranks fresh data — a smaller event set
+                    # may simply be the current truth
+                    expired = (
+                        previous
+                        and time.time() - previous["ts"] >= self._report_cache_ttl
+                    )
+                    if (
+                        not previous
+                        or expired
+                        or len(verification_report["disasters"])
+                        >= len(previous["report"].get("disasters", []))
+                    ):
+                        cache[cache_key] = {
+                            "ts": time.time(),
+                            "report": verification_report,
+                        }
+            except Exception as e:
+                self.logger.warning("Verification cache write error: %s", e)
+
+    def _breaker_open(self, source_name):
+        """
+        True while a source has failed too many times in a row within
+        the breaker window; a stale last failure closes the breaker
+        """
+        if self._source_failures[source_name] <= self._breaker_threshold:
+            return False
+        last_fail = self._source_last_fail.get(source_name, 0)
+        if time.time() - last_fail >= self._breaker_window_seconds:
+            self._source_failures[source_name] = 0
+            return False
+        self.logger.warning("Skipping %s: circuit breaker open", source_name)
+        return True
+
+    def _record_source_failure(self, source_name):
+        self._source_failures[source_name] += 1
+        self._source_last_fail[source_name] = time.time()
+
     def _check_nasa_eonet(self, latitude, longitude, date, radius_km):
         """
         Check NASA's Earth Observatory Natural Event Tracker
         """
         disasters = []
+        if self._breaker_open("nasa_eonet"):
+            return disasters
         try:
-            response = requests.get(
-                self.apis["nasa_eonet"]["url"], params=self.apis["nasa_eonet"]["params"]
+            payload = self._cached_get(
+                self.apis["nasa_eonet"]["url"],
+                params=self.apis["nasa_eonet"]["params"],
+                ttl=600,
             )
-            if response.status_code == 200:
-                events = response.json().get("events", [])
-
-                nasa_eonet_disasters = []
-
-                for event in events:
-                    nasa_eonet_disasters.append(event)
-                    # Check if event is close to location and date
-                    if self._is_event_relevant(
-                        event, latitude, longitude, date, radius_km
-                    ):
+            if payload is not None:
+                events = payload.get("events", [])
+
+                # Compute all event distances in one vectorized pass
+                # instead of per-event Python trig, then date-check only
+                # the events that fall inside the radius
+                target_datetime = self._parse_target_date(date)
+                candidates = [event for event in events if event.get("geometry")]
+                if candidates:
+                    lats = np.fromiter(
+                        (
+                            event["geometry"][0].get("coordinates", [0, 0])[1]
+                            for event in candidates
+                        ),
+                        dtype=float,
+                        count=len(candidates),
+                    )
+                    lons = np.fromiter(
+                        (
+                            event["geometry"][0].get("coordinates", [0, 0])[0]
+                            for event in candidates
+                        ),
+                        dtype=float,
+                        count=len(candidates),
+                    )
+                    # Cheap bounding-box prefilter: far events are
+                    # rejected with two compares before any trig runs
+                    lat_window = radius_km / 111.0
+                    lon_window = radius_km / (
+                        111.0 * max(np.cos(np.radians(latitude)), 1e-6)
+                    )
+                    near = np.nonzero(
+                        (np.abs(lats - latitude) <= lat_window)
+                        & (np.abs(lons - longitude) <= lon_window)
+                    )[0]
+                    lats = lats[near]
+                    lons = lons[near]
+
+                    dlat = np.radians(lats - latitude)
+                    dlon = np.radians(lons - longitude)
+                    a = (
+                        np.sin(dlat / 2) ** 2
+                        + np.cos(np.radians(latitude))
+                        * np.cos(np.radians(lats))
+                        * np.sin(dlon / 2) ** 2
+                    )
+                    distances = 2 * _EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+                    for index in near[np.nonzero(distances <= radius_km)[0]]:
+                        event = candidates[index]
+                        if not self._is_date_close(
+                            event["geometry"][0].get("date"), target_datetime
+                        ):
+                            continue
                         disasters.append(
                             {
                                 "source": "NASA EONET",
@@ -113,10 +373,13 @@ class IndianDisasterVerificationService:
                             }
                         )
 
-                with open("nasa_eonet_disasters.json", "w") as f:
-                    json.dump(nasa_eonet_disasters, f, indent=2)
+                if self.debug:
+                    with open("nasa_eonet_disasters.json", "w") as f:
+                        json.dump(events, f, indent=2)
+            self._source_failures["nasa_eonet"] = 0
         except Exception as e:
-            self.logger.error(f"NASA EONET API error: {e}")
+            self._record_source_failure("nasa_eonet")
+            self.logger.error("NASA EONET API error: %s", e)
 
         return disasters
 
@@ -125,24 +388,25 @@ class IndianDisasterVerificationService:
         Check ReliefWeb disaster reports for India
         """
         disasters = []
+        if self._breaker_open("reliefweb"):
+            return disasters
         try:
-            response = requests.get(
-                self.apis["reliefweb"]["url"], params=self.apis["reliefweb"]["params"]
+            payload = self._cached_get(
+                self.apis["reliefweb"]["url"],
+                params=self.apis["reliefweb"]["params"],
+                ttl=300,
             )
 
-            if response.status_code == 200:
-                disaster_data = response.json().get("data", [])
-                relief_disasters = []
+            if payload is not None:
+                # fields[include][] on the listing returns everything the
+                # report needs, so there is no per-disaster detail fetch
+                disaster_data = payload.get("data", [])
 
+                target_datetime = self._parse_target_date(date)
                 for disaster in disaster_data:
-                    disaster_response = requests.get(disaster.get("href"))
-                    disaster = disaster_response.json().get("data", [])[0]
-
-                    relief_disasters.append(disaster)
-
                     # Check if disaster is close to location and date
                     if self._is_reliefweb_event_relevant(
-                        disaster, latitude, longitude, date, radius_km
+                        disaster, latitude, longitude, target_datetime, radius_km
                     ):
                         disasters.append(
                             {
@@ -163,112 +427,80 @@ class IndianDisasterVerificationService:
                             }
                         )
 
-                with open("reliefweb_disasters.json", "w") as f:
-                    json.dump(relief_disasters, f, indent=2)
+                if self.debug:
+                    with open("reliefweb_disasters.json", "w") as f:
+                        json.dump(disaster_data, f, indent=2)
 
+            self._source_failures["reliefweb"] = 0
         except Exception as e:
-            self.logger.error(f"ReliefWeb API error: {e}")
+            self._record_source_failure("reliefweb")
+            self.logger.error("ReliefWeb API error: %s", e)
         return disasters
 
-    def _is_event_relevant(self, event, latitude, longitude, target_date, radius_km):
-        """
-        Check if an event is relevant to the specified location and date
-        """
-        # Implement haversine formula for distance calculation
-        from math import atan2, cos, radians, sin, sqrt
-
-        # print("Event: ", json.dumps(event, indent=2))
-        # print("Latitude: ", latitude)
-        # print("Longitude: ", longitude)
-        # print("Target Date: ", target_date)
-        # print("Radius: ", radius_km)
-
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            R = 6371  # Earth radius in kilometers
-
-            # Convert degrees to radians
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-
-            # Haversine formula
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            c = 2 * atan2(sqrt(a), sqrt(1 - a))
-            distance = R * c
-
-            return distance
-
-        # Check event geometry (coordinates)
-        if event.get("geometry"):
-            event_coords = event["geometry"][0]
-            event_lat = event_coords.get("coordinates", [0, 0])[1]
-            event_lon = event_coords.get("coordinates", [0, 0])[0]
-
-            # Calculate distance
-            distance = haversine_distance(latitude, longitude, event_lat, event_lon)
-
-            # Check if within radius and date is close
-            event_date = event_coords.get("date")
-
-            if distance <= radius_km and self._is_date_close(event_date, target_date):
-                return True
-
-        return False
-
     def _is_reliefweb_event_relevant(
-        self, disaster, latitude, longitude, target_date, radius_km
+        self, disaster, latitude, longitude, target_datetime, radius_km
     ):
         """
         Check relevance for ReliefWeb events
         """
-        from math import atan2, cos, radians, sin, sqrt
-
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            R = 6371  # Earth radius in kilometers
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-            c = 2 * atan2(sqrt(a), sqrt(1 - a))
-            distance = R * c
-            return distance
-
         # Check disaster location (coordinates)
         if disaster.get("fields", {}).get("country", [{}])[0].get("location"):
             disaster_coords = disaster["fields"]["country"][0]["location"]
             disaster_lat = disaster_coords.get("lat")
             disaster_lon = disaster_coords.get("lon")
 
+            # Bounding-box prefilter: reject far-away disasters with two
+            # compares before paying for the haversine trig
+            lat_window = radius_km / 111.0
+            lon_window = radius_km / (111.0 * max(cos(radians(latitude)), 1e-6))
+            if (
+                abs(disaster_lat - latitude) > lat_window
+                or abs(disaster_lon - longitude) > lon_window
+            ):
+                return False
+
             # Calculate distance
-            distance = haversine_distance(
-                latitude, longitude, disaster_lat, disaster_lon
-            )
+            distance = _haversine(latitude, longitude, disaster_lat, disaster_lon)
 
             # Check if within radius and date is close
             disaster_date = disaster.get("fields", {}).get("date", {}).get("created")
             # print("Disaster Date: ", disaster_date)
             if distance <= radius_km and self._is_date_close(
-                disaster_date, target_date
+                disaster_date, target_datetime
             ):
                 return True
 
         return False
 
-    def _is_date_close(self, event_date, target_date, days_threshold=30):
+    def _parse_target_date(self, target_date):
+        """
+        Parse the incident date once per source check instead of once
+        per candidate event
+        """
+        try:
+            return datetime.fromisoformat(target_date)
+        except (TypeError, ValueError) as e:
+            self.logger.warning("Unparseable incident date %r: %s", target_date, e)
+            return None
+
+    def _is_date_close(self, event_date, target_datetime, days_threshold=30):
         """
         Check if dates are within a reasonable proximity
+
+        :param target_datetime: Pre-parsed incident datetime (see
+            _parse_target_date)
         """
+        if target_datetime is None:
+            return False
         try:
             event_datetime = datetime.fromisoformat(event_date.replace("Z", "+00:00"))
-            target_datetime = datetime.fromisoformat(target_date)
 
             aware_target_datetime = target_datetime.replace(
                 tzinfo=event_datetime.tzinfo
             )  # Ensure same timezone
-            target_datetime = aware_target_datetime
 
             # Check if within specified number of days
-            date_difference = abs((event_datetime - target_datetime).days)
+            date_difference = abs((event_datetime - aware_target_datetime).days)
             return date_difference <= days_threshold
         except Exception as e:
             print("Error in date comparison: ", e)
@@ -278,18 +510,17 @@ class IndianDisasterVerificationService:
         """
         Generate insurance claim verification report
         """
+        # Single pass over the disasters collects both the types and the
+        # distinct sources
+        types = []
+        sources = set()
+        for disaster in verification_result.get("disasters", ()):
+            types.append(disaster["type"])
+            sources.add(disaster["source"])
         return {
             "claim_verifiable": verification_result["disaster_occurred"],
-            "disaster_types": [
-                disaster["type"]
-                for disaster in verification_result.get("disasters", [])
-            ],
-            "disaster_sources": list(
-                set(
-                    disaster["source"]
-                    for disaster in verification_result.get("disasters", [])
-                )
-            ),
+            "disaster_types": types,
+            "disaster_sources": list(sources),
         }
 
 
@@ -1,6 +1,7 @@
-import base64
+import hashlib
 import io
 import os
+import threading
 from typing import Any, Dict
 
 import google.generativeai as genai
@@ -32,37 +33,62 @@ class PlantIdentificationService:
         # Initialize the model
         self.model = genai.GenerativeModel("gemini-1.5-flash")
 
-    def _preprocess_image(self, image_path: str):
+        # Identification results keyed by image content hash, so
+        # verifying the same image against several expected crops (or
+        # re-running a claim) costs one Gemini call, not one per check
+        self._identify_cache: Dict[str, Dict[str, Any]] = {}
+        self._identify_cache_lock = threading.Lock()
+
+    def _read_image_bytes(self, image_source) -> bytes:
+        """
+        Read the raw bytes behind a path or file-like image source
         """
-        Preprocess and convert image to base64
+        if isinstance(image_source, (str, os.PathLike)):
+            with open(image_source, "rb") as file:
+                return file.read()
+        return image_source.read()
 
-        :param image_path: Path to the image file
-        :return: Base64 encoded image bytes
+    def _preprocess_image(self, image_source):
         """
-        try:
-            with Image.open(image_path) as img:
-                return img
+        Preprocess the image into compact JPEG bytes for the API
 
+        :param image_source: Path to the image file or a file-like object
+        :return: Raw JPEG bytes
+        """
+        try:
+            with Image.open(image_source) as img:
                 # Resize large images to reduce API call size
                 img.thumbnail((800, 800))
+                if img.mode != "RGB":
+                    img = img.convert("RGB")
 
-                # Convert image to bytes
+                # Raw bytes go straight to the API — no base64 step, so
+                # no extra copy and no 33% payload inflation
                 byte_arr = io.BytesIO()
-                img.save(byte_arr, format="JPEG")
-                return base64.b64encode(byte_arr.getvalue()).decode("utf-8")
+                img.save(byte_arr, format="JPEG", quality=85, optimize=True)
+                return byte_arr.getvalue()
         except Exception as e:
             raise ValueError(f"Image preprocessing error: {str(e)}")
 
-    def identify_crop(self, image_path: str) -> Dict[str, Any]:
+    def identify_crop(self, image_source) -> Dict[str, Any]:
         """
         Identify crop type from an image
 
-        :param image_path: Path to the farm/crop image
+        :param image_source: Path to the farm/crop image or a file-like object
         :return: Dictionary with crop identification details
         """
         try:
+            # Cache on content, not path, so renames and file-like
+            # sources still hit
+            source_bytes = self._read_image_bytes(image_source)
+            cache_key = hashlib.blake2b(source_bytes, digest_size=16).hexdigest()
+            with self._identify_cache_lock:
+                cached = self._identify_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
             # Preprocess image
-            image = self._preprocess_image(image_path)
+            image_bytes = self._preprocess_image(io.BytesIO(source_bytes))
 
             # Prepare prompt
             prompt = """
@@ -77,14 +103,19 @@ class PlantIdentificationService:
             """
 
             # Generate response
-            response = self.model.generate_content([prompt, image])
+            response = self.model.generate_content(
+                [prompt, {"mime_type": "image/jpeg", "data": image_bytes}]
+            )
 
             # Process and return results
-            return {
+            result = {
                 "success": True,
                 "identification": response.text,
                 "raw_response": response,
             }
+            with self._identify_cache_lock:
+                self._identify_cache[cache_key] = result
+            return result
 
         except Exception as e:
             return {
@@ -93,17 +124,17 @@ class PlantIdentificationService:
                 "details": "Crop identification failed",
             }
 
-    def verify_crop_match(self, image_path: str, expected_crop: str) -> Dict[str, Any]:
+    def verify_crop_match(self, image_source, expected_crop: str) -> Dict[str, Any]:
         """
         Verify if the crop in the image matches the expected crop
 
-        :param image_path: Path to the farm/crop image
+        :param image_source: Path to the farm/crop image or a file-like object
         :param expected_crop: Crop type expected according to insurance policy
         :return: Verification results
         """
         try:
             # Identify crop
-            identification_result = self.identify_crop(image_path)
+            identification_result = self.identify_crop(image_source)
 
             if not identification_result["success"]:
                 return {
@@ -1,38 +1,130 @@
+import fcntl
+import functools
+import os
+import shelve
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+# Shared pooled session so repeat lookups reuse the keep-alive
+# connection instead of paying a TCP+TLS handshake per call, with
+# exponential backoff on transient errors
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.5),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
 
-def get_location_name(latitude, longitude, complete=False):
-    response = requests.get(
-        f"https://api.bigdatacloud.net/data/reverse-geocode-client?latitude={latitude}&longitude={longitude}&localityLanguage=en"
+# On-disk cache so geocodes survive process restarts; the lru_cache
+# in front of it serves hot repeats without touching the shelf
+_CACHE_PATH = os.path.join(tempfile.gettempdir(), "reverse_geocode_cache")
+_CACHE_LOCK = threading.Lock()
+
+
+@contextmanager
+def _exclusive_shelf(path):
+    # Every access opens the shelf writable and gdbm is single-writer,
+    # so hold an flock while it is open to stay safe when several
+    # worker processes share the cache path
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with shelve.open(path) as cache:
+                yield cache
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_cached(key):
+    with _CACHE_LOCK:
+        try:
+            with _exclusive_shelf(_CACHE_PATH) as cache:
+                return cache.get(key)
+        except Exception:
+            return None
+
+
+def _store_cached(key, value):
+    with _CACHE_LOCK:
+        try:
+            with _exclusive_shelf(_CACHE_PATH) as cache:
+                cache[key] = value
+        except Exception:
+            pass
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_location_name(latitude, longitude, complete):
+    # Only successful lookups ever return from here: failures raise, and
+    # lru_cache does not memoize raised exceptions, so a transient API
+    # error is retried on the next call instead of being pinned
+    cache_key = f"{latitude}|{longitude}|{complete}"
+    cached = _read_cached(cache_key)
+    if cached is not None:
+        return cached
+
+    response = _SESSION.get(
+        f"https://api.bigdatacloud.net/data/reverse-geocode-client?latitude={latitude}&longitude={longitude}&localityLanguage=en",
+        timeout=5,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    locality_info = data.get("localityInfo", {})
+    items = locality_info.get("administrative", []) + locality_info.get(
+        "informative", []
     )
-    if response.status_code == 200:
-        data = response.json()
-
-        ordered_address = []
-        for key in data.get("localityInfo", {}).get("administrative", []):
-            ordered_address.append(key)
-        for key in data.get("localityInfo", {}).get("informative", []):
-            ordered_address.append(key)
-        ordered_address.sort(key=lambda x: x.get("order", 0), reverse=True)
-        complete_address = [data.get("plusCode", "")] + [
-            key.get("name", "") for key in ordered_address
-        ]
-
-        if complete:
-            return ", ".join([key for key in complete_address])
-
-        address_components = [
-            data.get("plusCode", ""),
-            data.get("locality", ""),
-            data.get("city", ""),
-            data.get("principalSubdivision", ""),
-            data.get("countryName", ""),
-            data.get("street", ""),
-            data.get("streetNumber", ""),
-        ]
-
-        return ", ".join(filter(None, address_components))
+    if len(items) > 1:
+        # Pull the sort keys into one array and argsort it instead
+        # of running a dict lookup per comparison; stable sort keeps
+        # ties in API order like list.sort did
+        orders = np.fromiter(
+            (item.get("order", 0) for item in items),
+            dtype=np.int32,
+            count=len(items),
+        )
+        ordered_address = [items[i] for i in np.argsort(-orders, kind="stable")]
     else:
+        ordered_address = items
+    complete_address = [data.get("plusCode", "")] + [
+        key.get("name", "") for key in ordered_address
+    ]
+
+    if complete:
+        location = ", ".join(complete_address)
+        _store_cached(cache_key, location)
+        return location
+
+    address_components = [
+        data.get("plusCode", ""),
+        data.get("locality", ""),
+        data.get("city", ""),
+        data.get("principalSubdivision", ""),
+        data.get("countryName", ""),
+        data.get("street", ""),
+        data.get("streetNumber", ""),
+    ]
+
+    location = ", ".join(filter(None, address_components))
+    _store_cached(cache_key, location)
+    return location
+
+
+def get_location_name(latitude, longitude, complete=False):
+    # Cached so claims from the same area reuse the reverse-geocode
+    # result instead of repeating the HTTP round-trip; callers should
+    # quantize coordinates (e.g. round to 3 decimals) for good hit rates
+    try:
+        return _cached_location_name(latitude, longitude, complete)
+    except Exception:
         return "Error retrieving location"
 
 
@@ -0,0 +1,7 @@
+from api import app
+
+# Production entry point:
+# gunicorn --worker-class gevent --workers 4 --worker-connections 1000 wsgi:app
+
+if __name__ == "__main__":
+    app.run(port=5000)